@@ -1,22 +1,54 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from transformers import pipeline
-from sklearn.cluster import KMeans
-from sklearn.feature_extraction.text import TfidfVectorizer
+import altair as alt
 from pyvis.network import Network
 import streamlit.components.v1 as components
-from sentence_transformers import SentenceTransformer
-import faiss
-from google import genai
+import os
+import hashlib
+from precompute import CSV_PATH, DATASET_PATH, FEATURES_PATH, CompoundSentimentAnalyzer, classify_emotions, load_emotion_pipe, load_toxicity_model, optimize_dtypes, parse_created_utc, score_toxicity, title_hash
+from domain_index import DomainIndex
 
 # -------------------------------
 # Load dataset
 # -------------------------------
-df = pd.read_csv("processed.csv")
-df['created_utc'] = pd.to_datetime(df['created_utc'])
+@st.cache_data
+def load_features():
+    # sidecar written by precompute.py; without it every title is scored live
+    if os.path.exists(FEATURES_PATH):
+        return pd.read_parquet(FEATURES_PATH)
+    return pd.DataFrame(columns=["title_hash", "sentiment", "toxicity", "emotion"]).astype({"title_hash": "uint64", "sentiment": "float32", "toxicity": "float32"})
+
+
+@st.cache_data
+def load_data():
+    # processed.parquet (from precompute.py) already has parsed timestamps and title hashes
+    if os.path.exists(DATASET_PATH):
+        df = pd.read_parquet(DATASET_PATH)
+    else:
+        df = pd.read_csv(CSV_PATH)
+        df['created_utc'] = parse_created_utc(df['created_utc'])
+        df['title_hash'] = title_hash(df['title'])
+    df['created_date'] = df['created_utc'].dt.floor('D')
+    df = df.drop(columns=["sentiment"]).merge(load_features(), on="title_hash", how="left", validate="many_to_one")
+    return optimize_dtypes(df)
+
+
+@st.cache_resource
+def load_domain_index(domains, days):
+    # shared by every session: domain -> rows, plus the domain x day post-count matrix
+    return DomainIndex(domains, days)
+
+
+df = load_data()
+domain_index = load_domain_index(df['domain'], df['created_date'])
+
+
+def get_daily_counts(dom):
+    # computed once per domain and reused by every section of the page
+    key = f"ts_{dom}"
+    if key not in st.session_state:
+        st.session_state[key] = domain_index.daily_counts(dom)
+    return st.session_state[key]
 
 # -------------------------------
 # Load NLP Models
@@ -25,49 +57,86 @@ df['created_utc'] = pd.to_datetime(df['created_utc'])
 
 @st.cache_resource
 def load_chat_components():
-    
+    # heavy imports happen here, on first use, instead of at app startup
+    import torch
+    from google import genai
+    from sentence_transformers import SentenceTransformer
+    from transformers import pipeline
+
+    device = 0 if torch.cuda.is_available() else -1
+
     embedder = SentenceTransformer("all-MiniLM-L6-v2")
 
     gemini_model = genai.Client(api_key=st.secrets["GOOGLE_API_KEY"]) 
 
     
-    qa_model = pipeline("text2text-generation", model="google/flan-t5-small")
-    sentiment_model = SentimentIntensityAnalyzer()
-    toxicity_pipe = pipeline("text-classification", model="unitary/toxic-bert", return_all_scores=False)
-    
-    # 4. Emotion Model (Needed for line 57)
-    emotion_pipe = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base")
+    qa_model = pipeline("text2text-generation", model="google/flan-t5-small", device=device)
 
     # We return the client instead of a GenerativeModel object
-    return embedder, gemini_model, qa_model, sentiment_model, toxicity_pipe, emotion_pipe
+    return embedder, gemini_model, qa_model
+
+
+@st.cache_resource
+def load_feature_models():
+    # only needed for titles the sidecar doesn't cover; kept apart so they never pull in the chat stack
+    sentiment_model = CompoundSentimentAnalyzer()
+    toxicity_model = load_toxicity_model()
+    emotion_pipe = load_emotion_pipe()
+    return sentiment_model, toxicity_model, emotion_pipe
 
-# Notice the variable name change to reflect the client object
-embedder, gemini_model, qa_model, sentiment_model, toxicity_pipe, emotion_pipe = load_chat_components()
 
 
 # -------------------------------
 # Compute NLP Features
 # -------------------------------
-@st.cache_data
+def frame_digest(data):
+    # row labels + title hashes identify a subset of df; hashing just these skips the wide text columns
+    return hashlib.md5(data.index.values.tobytes() + data['title_hash'].values.tobytes()).hexdigest()
+
+
+@st.cache_data(hash_funcs={pd.DataFrame: frame_digest})
 def compute_text_features(data):
-    data = data.copy()
+    # features come from the precomputed sidecar; only titles it doesn't cover are scored here
+    missing = data[["sentiment", "toxicity", "emotion"]].isna().any(axis=1).to_numpy()
+    if not missing.any():
+        return data
+
+    sentiment_model, toxicity_model, emotion_pipe = load_feature_models()
+
+    # one batched call per model instead of one call per row
+    titles = data.loc[missing, "title"].astype(str).tolist()
 
     # sentiment
-    data["sentiment"] = data["title"].apply(lambda x: sentiment_model.polarity_scores(str(x))['compound'])
+    sentiment = data["sentiment"].to_numpy(dtype="float32", copy=True)
+    sentiment[missing] = [sentiment_model.compound(t) for t in titles]
 
     # toxicity
-    data["toxicity"] = data["title"].apply(lambda x: toxicity_pipe(str(x))[0]['score'])
+    toxicity = data["toxicity"].to_numpy(dtype="float32", copy=True)
+    toxicity[missing] = score_toxicity(titles, toxicity_model)
 
     # emotion classification
-    def safe_emotion(text):
-        try:
-            return emotion_pipe(str(text))[0][0]['label']
-        except:
-            return "unknown"
+    emotion = data["emotion"].to_numpy(dtype=object, copy=True)
+    try:
+        emotion[missing] = classify_emotions(titles, emotion_pipe)
+    except Exception:
+        emotion[missing] = "unknown"
 
-    data["emotion"] = data["title"].apply(safe_emotion)
+    # assign() only adds the three columns; the title/url columns aren't duplicated
+    return data.assign(sentiment=sentiment, toxicity=toxicity, emotion=pd.Categorical(emotion))
 
-    return data
+# -------------------------------
+# Topic Clustering
+# -------------------------------
+@st.cache_data
+def cluster_titles(_titles, key):
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    # cached on the title hashes (key) instead of re-hashing every title string
+    vectorizer = HashingVectorizer(stop_words='english', n_features=2**12, alternate_sign=False, norm='l2')
+    X = vectorizer.transform(_titles)
+    kmeans = MiniBatchKMeans(n_clusters=3, batch_size=512, n_init=3, random_state=42)
+    return kmeans.fit_predict(X)
 
 # -------------------------------
 # UI
@@ -79,8 +148,9 @@ domain2 = st.text_input("Optional second domain for comparison:")
 
 if domain1:
 
-    filtered = df[df['domain'].str.contains(domain1, case=False, na=False)]
+    filtered = domain_index.lookup(df, domain1)
     filtered = compute_text_features(filtered)
+    ts = get_daily_counts(domain1)
 
     st.success(f"{len(filtered)} posts found for {domain1}")
 
@@ -96,28 +166,30 @@ if domain1:
     # Emotion Chart
     # -------------------------------
     st.subheader("🧠 Emotion Distribution")
-    emotion_counts = filtered['emotion'].value_counts()
-    fig, ax = plt.subplots()
-    sns.barplot(x=emotion_counts.values, y=emotion_counts.index, ax=ax)
-    st.pyplot(fig)
+    emotion_counts = filtered['emotion'].value_counts().reset_index()
+    st.altair_chart(
+        alt.Chart(emotion_counts).mark_bar().encode(x='count:Q', y=alt.Y('emotion:N', sort='-x')),
+        use_container_width=True,
+    )
 
     # -------------------------------
     # Time Series Trend
     # -------------------------------
     st.subheader("📈 Trend Over Time")
-    ts = filtered.resample('D', on='created_utc').size()
-    fig2, ax2 = plt.subplots()
-    ts.plot(ax=ax2)
-    st.pyplot(fig2)
+    st.altair_chart(
+        alt.Chart(ts.reset_index(name='count')).mark_line().encode(x='created_utc:T', y='count:Q'),
+        use_container_width=True,
+    )
 
     # -------------------------------
     # Top Subreddits
     # -------------------------------
     st.subheader("🔥 Top Subreddits Posting This Domain")
-    sr = filtered['subreddit'].value_counts().head(10)
-    fig3, ax3 = plt.subplots()
-    sns.barplot(x=sr.values, y=sr.index, ax=ax3)
-    st.pyplot(fig3)
+    sr = filtered['subreddit'].value_counts().head(10).reset_index()
+    st.altair_chart(
+        alt.Chart(sr).mark_bar().encode(x='count:Q', y=alt.Y('subreddit:N', sort='-x')),
+        use_container_width=True,
+    )
 
     # -------------------------------
     # Network Graph
@@ -138,18 +210,14 @@ if domain1:
 
     if not filtered.empty:
         net = create_network_graph(filtered, domain1)
-        path = "network_graph.html"
-        net.save_graph(path)
-        components.html(open(path, "r", encoding="utf-8").read(), height=600)
+        # render the HTML in memory rather than writing network_graph.html and reading it back
+        components.html(net.generate_html(), height=600)
 
     # -------------------------------
     # Topic Clustering
     # -------------------------------
     st.subheader("🧩 Topic Clustering (Auto Themes)")
-    vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
-    X = vectorizer.fit_transform(filtered['title'])
-    kmeans = KMeans(n_clusters=3, random_state=42)
-    filtered['cluster'] = kmeans.fit_predict(X)
+    filtered = filtered.assign(cluster=cluster_titles(filtered['title'], filtered['title_hash'].values.tobytes()))
     st.write(filtered[['title', 'cluster']].head(20))
 
     # -------------------------------
@@ -157,7 +225,7 @@ if domain1:
     # -------------------------------
     st.subheader("📌 AI Summary Report")
 
-    def generate_story(data, dom):
+    def generate_story(data, dom, ts):
         tone = "negative" if data['sentiment'].mean() < -0.1 else "mixed" if data['sentiment'].mean() < 0.1 else "positive"
         top_emotion = data['emotion'].value_counts().idxmax()
         top_sub = data['subreddit'].value_counts().idxmax()
@@ -167,12 +235,12 @@ if domain1:
         Tone is **{tone}**, most emotionally represented by **{top_emotion}**.
         Most activity originates from **r/{top_sub}**.
 
-        Peak posting activity reached **{data.resample('D', on='created_utc').size().max()} posts/day**, indicating event-driven spikes.
+        Peak posting activity reached **{ts.max()} posts/day**, indicating event-driven spikes.
 
         Content forms **{data['cluster'].nunique()} main thematic clusters**, revealing diverse narratives.
         """
 
-    st.info(generate_story(filtered, domain1))
+    st.info(generate_story(filtered, domain1, ts))
 
     # -------------------------------
     # Chatbot Assistant
@@ -180,6 +248,9 @@ if domain1:
     st.subheader("💬 Ask the Dataset Anything")
     
     if len(filtered) > 5:
+        import faiss
+
+        embedder, gemini_model, qa_model = load_chat_components()
     
         @st.cache_data
         def build_index(df):
@@ -259,12 +330,11 @@ if domain1:
 if domain1 and domain2:
     st.subheader("⚔️ Activity Comparison")
 
-    def get_ts(dom):
-        d = compute_text_features(df[df['domain'].str.contains(dom, case=False, na=False)])
-        return d.resample('D', on='created_utc').size()
-
-    fig4, ax4 = plt.subplots()
-    get_ts(domain1).plot(ax=ax4, label=domain1)
-    get_ts(domain2).plot(ax=ax4, label=domain2)
-    ax4.legend()
-    st.pyplot(fig4)
+    comparison = pd.concat([
+        get_daily_counts(domain1).reset_index(name='count').assign(domain=domain1),
+        get_daily_counts(domain2).reset_index(name='count').assign(domain=domain2),
+    ])
+    st.altair_chart(
+        alt.Chart(comparison).mark_line().encode(x='created_utc:T', y='count:Q', color='domain:N'),
+        use_container_width=True,
+    )
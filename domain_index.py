@@ -0,0 +1,76 @@
+"""Prebuilt lookup from a typed domain query to the rows that match it.
+
+Filtering with ``df['domain'].str.contains(query)`` scans every row on each
+keystroke. The index groups row positions by lowercased domain once, so a
+query only has to be matched against the distinct domains, and repeated
+queries are answered from an LRU cache.
+
+Given the posts' days as well, it also keeps a dense domain x day matrix of
+post counts, so a domain's daily time series is a row slice instead of a
+resample over the raw rows.
+"""
+import functools
+
+import numpy as np
+import pandas as pd
+
+
+class DomainIndex:
+    def __init__(self, domains, days=None):
+        # Arrow-backed strings so lowercasing and substring search run in Arrow's compute kernels
+        domain_lc = domains.astype("string[pyarrow]").str.lower()
+        # distinct lowercased domain -> ndarray of row positions (NaN domains are dropped)
+        self.rows = domain_lc.groupby(domain_lc).indices
+        self.keys = pd.Series(list(self.rows), dtype="string[pyarrow]")
+        self.matching_keys = functools.lru_cache(maxsize=256)(self._matching_keys)
+        self.daily = None if days is None else self._build_daily(domain_lc, days)
+
+    @staticmethod
+    def _build_daily(domain_lc, days):
+        """Posts per (domain, day), one zero-filled column per calendar day."""
+        daily = (
+            pd.DataFrame({"domain_lc": domain_lc.to_numpy(), "day": days.to_numpy()})
+              .groupby(["domain_lc", "day"])
+              .size()
+              .unstack(fill_value=0)
+        )
+        if not daily.empty:
+            daily = daily.reindex(columns=pd.date_range(daily.columns.min(), daily.columns.max(), freq="D"), fill_value=0)
+        return daily.astype(np.int32)
+
+    def _matching_keys(self, query):
+        """Distinct domains containing ``query``, case-insensitively."""
+        matches = self.keys.str.contains(query.lower(), regex=False)
+        return tuple(self.keys[matches.to_numpy(dtype=bool)])
+
+    def positions(self, query):
+        """Sorted row positions whose domain contains ``query``."""
+        keys = self.matching_keys(query)
+        if not keys:
+            return np.array([], dtype=np.intp)
+        return np.sort(np.concatenate([self.rows[k] for k in keys]))
+
+    def daily_counts(self, query):
+        """Posts per day for domains containing ``query``.
+
+        Spans the matching posts' first to last day, zero-filled in between,
+        the same as ``resample('D', on='created_utc').size()`` on the rows.
+        """
+        keys = self.matching_keys(query)
+        counts = self.daily.loc[list(keys)].to_numpy().sum(axis=0, dtype=np.int64)
+        active = np.flatnonzero(counts)
+        if not len(active):
+            return pd.Series([], index=pd.DatetimeIndex([], freq="D", name="created_utc"), dtype=np.int64, name="count")
+        span = slice(active[0], active[-1] + 1)
+        index = pd.DatetimeIndex(self.daily.columns[span], freq="D", name="created_utc")
+        return pd.Series(counts[span], index=index, name="count")
+
+    def lookup(self, df, query):
+        """Rows of ``df`` (the frame the index was built from) matching ``query``.
+
+        Categorical columns are trimmed to the categories present in the
+        subset so value_counts() doesn't report zero-count entries.
+        """
+        subset = df.iloc[self.positions(query)]
+        trimmed = {c: subset[c].cat.remove_unused_categories() for c in subset.select_dtypes("category")}
+        return subset.assign(**trimmed) if trimmed else subset
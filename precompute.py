@@ -0,0 +1,261 @@
+"""Precompute NLP features for the dataset into a Parquet sidecar.
+
+Run once (or whenever processed.csv changes):
+
+    python precompute.py
+
+This writes two files next to the CSV:
+
+- ``processed.parquet``: the dataset itself with ``created_utc`` already
+  parsed and ``title_hash`` attached, so app.py can skip CSV parsing.
+- ``processed_features.parquet``: sentiment/toxicity/emotion per distinct
+  title. app.py merges it on ``title_hash`` at startup, so only titles
+  missing from it go through the transformer models at runtime.
+
+torch and transformers are imported inside the functions that use them, so
+the dashboards can import the dataset helpers here without paying for them
+at startup.
+"""
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import xxhash
+from vaderSentiment.vaderSentiment import BOOSTER_DICT, SentimentIntensityAnalyzer, SentiText, normalize
+
+CSV_PATH = "processed.csv"
+DATASET_PATH = "processed.parquet"
+FEATURES_PATH = "processed_features.parquet"
+CHUNK_SIZE = 2048
+BATCH_SIZE = 32
+NUM_WORKERS = 4
+CREATED_UTC_FORMAT = "%Y-%m-%d %H:%M:%S"
+TOXICITY_MODEL = "unitary/toxic-bert"
+EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+CATEGORY_COLUMNS = ["domain", "subreddit", "emotion"]
+FLOAT_COLUMNS = ["sentiment", "toxicity"]
+
+# set in each pool process by _init_worker
+_worker_models = None
+
+
+class CompoundSentimentAnalyzer(SentimentIntensityAnalyzer):
+    """VADER that only computes the compound score.
+
+    polarity_scores() also sifts the token valences into pos/neg/neu and
+    builds a dict of four rounded floats per text, but only ``compound`` is
+    ever read here. compound() follows the same steps and stops there.
+    """
+
+    def compound(self, text):
+        # same emoji-to-description rewrite as polarity_scores, built with a list
+        if any(c in self.emojis for c in text):
+            parts = []
+            prev_space = True
+            for c in text:
+                if c in self.emojis:
+                    if not prev_space:
+                        parts.append(' ')
+                    parts.append(self.emojis[c])
+                    prev_space = False
+                else:
+                    parts.append(c)
+                    prev_space = c == ' '
+            text = ''.join(parts)
+        text = text.strip()
+
+        sentitext = SentiText(text)
+        words_and_emoticons = sentitext.words_and_emoticons
+        sentiments = []
+        for i, item in enumerate(words_and_emoticons):
+            if item.lower() in BOOSTER_DICT:
+                sentiments.append(0)
+                continue
+            if (i < len(words_and_emoticons) - 1 and item.lower() == "kind" and
+                    words_and_emoticons[i + 1].lower() == "of"):
+                sentiments.append(0)
+                continue
+            sentiments = self.sentiment_valence(0, sentitext, item, i, sentiments)
+        sentiments = self._but_check(words_and_emoticons, sentiments)
+
+        if not sentiments:
+            return 0.0
+        sum_s = float(sum(sentiments))
+        punct_emph_amplifier = self._punctuation_emphasis(text)
+        if sum_s > 0:
+            sum_s += punct_emph_amplifier
+        elif sum_s < 0:
+            sum_s -= punct_emph_amplifier
+        return round(normalize(sum_s), 4)
+
+
+def title_hash(titles):
+    """Stable 64-bit hash of each title, used as the sidecar join key."""
+    return np.fromiter(
+        (xxhash.xxh64_intdigest(str(t).encode("utf-8")) for t in titles),
+        dtype=np.uint64,
+        count=len(titles),
+    )
+
+
+def parse_created_utc(values):
+    """Parses created_utc given as epoch seconds or in the dataset's fixed timestamp format."""
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.to_datetime(values, unit="s")
+    try:
+        return pd.to_datetime(values, format=CREATED_UTC_FORMAT)
+    except ValueError:
+        # uploaded files may use some other layout; let pandas infer it
+        return pd.to_datetime(values)
+
+
+def optimize_dtypes(df):
+    """Stores repeat-heavy string columns as categories and scores as float32."""
+    for c in CATEGORY_COLUMNS:
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+    for c in FLOAT_COLUMNS:
+        if c in df.columns:
+            df[c] = df[c].astype(np.float32)
+    return df
+
+
+def convert_dataset():
+    """Writes the CSV out as Parquet with proper dtypes."""
+    df = pd.read_csv(CSV_PATH)
+    df["created_utc"] = parse_created_utc(df["created_utc"])
+    df["title_hash"] = title_hash(df["title"])
+    df = optimize_dtypes(df)
+    df.to_parquet(DATASET_PATH, index=False)
+    print(f"wrote {len(df)} rows to {DATASET_PATH}")
+
+
+def quantize(model):
+    """int8 dynamic quantization of the Linear layers, for CPU inference."""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_toxicity_model():
+    """toxic-bert tokenizer and model, used directly instead of through pipeline()."""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    tokenizer = AutoTokenizer.from_pretrained(TOXICITY_MODEL)
+    model = AutoModelForSequenceClassification.from_pretrained(TOXICITY_MODEL).to(device).eval()
+    if device == "cuda":
+        model = model.half()
+    else:
+        model = quantize(model)
+    return tokenizer, model
+
+
+def load_emotion_pipe():
+    import torch
+    from transformers import pipeline
+    device = 0 if torch.cuda.is_available() else -1
+    emotion_pipe = pipeline("text-classification", model=EMOTION_MODEL, device=device)
+    emotion_pipe.model.eval()
+    if device == -1:
+        emotion_pipe.model = quantize(emotion_pipe.model)
+    return emotion_pipe
+
+
+def score_toxicity(texts, toxicity_model, batch_size=64):
+    """Sigmoid probability of toxic-bert's ``toxic`` label for each text."""
+    import torch
+    tokenizer, model = toxicity_model
+    toxic_idx = model.config.label2id.get("toxic", 0)
+    scores = []
+    for start in range(0, len(texts), batch_size):
+        enc = tokenizer(texts[start:start + batch_size], padding=True, truncation=True, max_length=128, return_tensors="pt").to(model.device)
+        with torch.inference_mode():
+            logits = model(**enc).logits
+        scores.append(torch.sigmoid(logits.float())[:, toxic_idx].cpu().numpy())
+    if not scores:
+        return np.array([], dtype=np.float32)
+    return np.concatenate(scores)
+
+
+def classify_emotions(texts, emotion_pipe, batch_size=BATCH_SIZE):
+    """Top emotion label for each text, with autograd disabled."""
+    import torch
+    with torch.inference_mode():
+        results = emotion_pipe(texts, batch_size=batch_size, truncation=True, top_k=1)
+    return [r[0]['label'] for r in results]
+
+
+def load_models():
+    sentiment_model = CompoundSentimentAnalyzer()
+    toxicity_model = load_toxicity_model()
+    emotion_pipe = load_emotion_pipe()
+    return sentiment_model, toxicity_model, emotion_pipe
+
+
+def score_titles(titles, sentiment_model, toxicity_model, emotion_pipe):
+    """Scores a list of titles with one batched call per model."""
+    sentiment = np.array([sentiment_model.compound(t) for t in titles], dtype=np.float32)
+    toxicity = score_toxicity(titles, toxicity_model)
+    emotion = classify_emotions(titles, emotion_pipe)
+    return pd.DataFrame({
+        "sentiment": sentiment,
+        "toxicity": np.asarray(toxicity, dtype=np.float32),
+        "emotion": emotion,
+    })
+
+
+def _init_worker():
+    """Gives each pool process its own models and an even share of the cores."""
+    import torch
+    global _worker_models
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // NUM_WORKERS))
+    _worker_models = load_models()
+
+
+def batch_infer(batch):
+    hashes, titles = batch
+    scores = score_titles(titles.tolist(), *_worker_models)
+    scores.insert(0, "title_hash", hashes)
+    return scores
+
+
+def distinct_titles():
+    """(hashes, titles) for every distinct title in the CSV, read in chunks."""
+    seen = set()
+    hashes, titles = [], []
+    for chunk in pd.read_csv(CSV_PATH, usecols=["title"], chunksize=CHUNK_SIZE):
+        chunk_titles = chunk["title"].astype(str).tolist()
+        for h, t in zip(title_hash(chunk_titles).tolist(), chunk_titles):
+            if h not in seen:
+                seen.add(h)
+                hashes.append(h)
+                titles.append(t)
+    return np.array(hashes, dtype=np.uint64), np.array(titles, dtype=object)
+
+
+def main():
+    convert_dataset()
+
+    hashes, titles = distinct_titles()
+    if not len(titles):
+        print(f"no titles in {CSV_PATH}; nothing to score")
+        return
+    n_parts = min(4 * NUM_WORKERS, len(titles))
+    batches = zip(np.array_split(hashes, n_parts), np.array_split(titles, n_parts))
+
+    # several small model instances beat one instance spread over every core
+    parts = []
+    with multiprocessing.get_context("spawn").Pool(NUM_WORKERS, initializer=_init_worker) as pool:
+        for scores in pool.imap_unordered(batch_infer, batches):
+            parts.append(scores)
+            print(f"scored {sum(len(p) for p in parts)}/{len(titles)} titles")
+
+    features = pd.concat(parts, ignore_index=True)
+    features["emotion"] = features["emotion"].astype("category")
+    features.to_parquet(FEATURES_PATH, index=False)
+    print(f"wrote {len(features)} rows to {FEATURES_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,12 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from google import genai
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from transformers import pipeline
-from sentence_transformers import SentenceTransformer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
-import faiss
 import numpy as np
 import datetime
 import streamlit.components.v1 as components
 import networkx as nx  # NEW: for network graphs
+from domain_index import DomainIndex
+from precompute import CompoundSentimentAnalyzer, classify_emotions, load_emotion_pipe, load_toxicity_model, optimize_dtypes, parse_created_utc, score_toxicity
 
 # ==========================================
 # 1. PAGE CONFIGURATION & STYLING
@@ -58,19 +53,27 @@ st.markdown("""
 # ==========================================
 
 @st.cache_resource
-def load_nlp_models():
-    """Loads heavy NLP models once and caches them."""
-    with st.spinner("Loading NLP Models (Embeddings, VADER, Toxicity, Emotion)..."):
-        embedder = SentenceTransformer("all-MiniLM-L6-v2")
-        sentiment_model = SentimentIntensityAnalyzer()
+def load_embedder():
+    """Loads the sentence embedder used by the chatbot once and caches it."""
+    # Imported here rather than at module level so the page layout renders before the model stack loads
+    from sentence_transformers import SentenceTransformer
+
+    with st.spinner("Loading embedding model..."):
+        return SentenceTransformer("all-MiniLM-L6-v2")
+
+@st.cache_resource
+def load_feature_models():
+    """Loads the sentiment, toxicity and emotion models once and caches them."""
+    with st.spinner("Loading NLP Models (VADER, Toxicity, Emotion)..."):
+        sentiment_model = CompoundSentimentAnalyzer()
         try:
-            toxicity_pipe = pipeline("text-classification", model="unitary/toxic-bert", return_all_scores=False)
-            emotion_pipe = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base")
+            toxicity_model = load_toxicity_model()
+            emotion_pipe = load_emotion_pipe()
         except Exception as e:
             st.error(f"Error loading Transformers: {e}. Running in lightweight mode.")
-            toxicity_pipe = None
+            toxicity_model = None
             emotion_pipe = None
-    return embedder, sentiment_model, toxicity_pipe, emotion_pipe
+    return sentiment_model, toxicity_model, emotion_pipe
 
 @st.cache_data
 def load_data(uploaded_file):
@@ -79,8 +82,9 @@ def load_data(uploaded_file):
         try:
             df = pd.read_csv(uploaded_file)
             if 'created_utc' in df.columns:
-                df['created_utc'] = pd.to_datetime(df['created_utc'])
-            return df
+                df['created_utc'] = parse_created_utc(df['created_utc'])
+                df['created_date'] = df['created_utc'].dt.floor('D')
+            return optimize_dtypes(df)
         except Exception as e:
             st.error(f"Error reading file: {e}")
             return None
@@ -94,8 +98,9 @@ def load_default_data():
     try:
         df = pd.read_csv(default_path)
         if 'created_utc' in df.columns:
-            df['created_utc'] = pd.to_datetime(df['created_utc'])
-        return df
+            df['created_utc'] = parse_created_utc(df['created_utc'])
+            df['created_date'] = df['created_utc'].dt.floor('D')
+        return optimize_dtypes(df)
     except FileNotFoundError:
         st.error(f"Default data file not found at: {default_path}")
         return None
@@ -103,6 +108,11 @@ def load_default_data():
         st.error(f"Error reading default file: {e}")
         return None
 
+@st.cache_resource
+def load_domain_index(domains, days=None):
+    """Builds the domain -> row positions index (and domain x day counts) once per dataset."""
+    return DomainIndex(domains, days)
+
 def generate_dummy_data():
     """Generates sample data for demonstration if no file is uploaded."""
     dates = pd.date_range(start="2025-01-01", periods=100)
@@ -119,44 +129,51 @@ def generate_dummy_data():
 # 3. LOGIC & PROCESSING
 # ==========================================
 
-def compute_features(df, sentiment_analyzer, toxic_pipe, emo_pipe):
+def compute_features(df, sentiment_analyzer, toxicity_model, emo_pipe):
     """Computes Sentiment, Toxicity, and Emotion if columns don't exist."""
-    df_proc = df.copy()
+    # New columns are collected and added with assign() rather than copying the whole frame first
+    new_cols = {}
     
     # Sentiment
-    if 'sentiment' not in df_proc.columns:
+    if 'sentiment' not in df.columns:
         with st.spinner("Computing VADER Sentiment..."):
-            df_proc['sentiment'] = df_proc['title'].apply(lambda x: sentiment_analyzer.polarity_scores(str(x))['compound'])
+            new_cols['sentiment'] = df['title'].astype(str).map(sentiment_analyzer.compound)
     
     # Toxicity & Emotion (Heavy Compute)
-    texts = df_proc['title'].astype(str).tolist()
+    texts = df['title'].astype(str).tolist()
     
-    if 'toxicity' not in df_proc.columns and toxic_pipe:
+    if 'toxicity' not in df.columns and toxicity_model:
         with st.spinner("Computing Toxicity Scores (BERT)..."):
-            results = toxic_pipe(texts, batch_size=8, truncation=True, max_length=512)
-            df_proc['toxicity'] = [r['score'] for r in results]
-    elif 'toxicity' not in df_proc.columns:
-        df_proc['toxicity'] = 0.0  # Fallback
+            new_cols['toxicity'] = score_toxicity(texts, toxicity_model)
+    elif 'toxicity' not in df.columns:
+        new_cols['toxicity'] = 0.0  # Fallback
 
-    if 'emotion' not in df_proc.columns and emo_pipe:
+    if 'emotion' not in df.columns and emo_pipe:
         with st.spinner("Classifying Emotions (RoBERTa)..."):
-            results = emo_pipe(texts, batch_size=8, truncation=True, max_length=512)
-            df_proc['emotion'] = [r['label'] for r in results]
-    elif 'emotion' not in df_proc.columns:
-        df_proc['emotion'] = 'neutral'  # Fallback
+            new_cols['emotion'] = classify_emotions(texts, emo_pipe, batch_size=8)
+    elif 'emotion' not in df.columns:
+        new_cols['emotion'] = 'neutral'  # Fallback
+
+    return optimize_dtypes(df.assign(**new_cols))
+
+@st.cache_data
+def cluster_labels(titles):
+    """Clusters titles with hashed features and mini-batch KMeans (cached per title set)."""
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.cluster import MiniBatchKMeans
 
-    return df_proc
+    vectorizer = HashingVectorizer(stop_words='english', n_features=2**12, alternate_sign=False, norm='l2')
+    X = vectorizer.transform(titles.astype(str))
+    kmeans = MiniBatchKMeans(n_clusters=min(3, len(titles)), batch_size=512, n_init=3, random_state=42)
+    return kmeans.fit_predict(X)
 
 def perform_clustering(df_subset):
     """Performs KMeans clustering on titles."""
     if len(df_subset) < 3:
         return df_subset
     
-    vectorizer = TfidfVectorizer(stop_words='english', max_features=500)
-    X = vectorizer.fit_transform(df_subset['title'])
-    kmeans = KMeans(n_clusters=min(3, len(df_subset)), random_state=42)
     df_subset = df_subset.copy()
-    df_subset['cluster'] = kmeans.fit_predict(X)
+    df_subset['cluster'] = cluster_labels(df_subset['title'])
     return df_subset
 
 def get_gemini_response(prompt, api_key):
@@ -164,6 +181,7 @@ def get_gemini_response(prompt, api_key):
     if not api_key:
         return "No Gemini API key provided. Please add it in the sidebar."
     try:
+        from google import genai
         client = genai.Client(api_key=api_key)
         response = client.models.generate_content(
             model="gemini-2.5-flash",
@@ -175,7 +193,7 @@ def get_gemini_response(prompt, api_key):
 
 # ========= NETWORK LOGIC (NEW) =========
 
-def build_network_graph(df, mode, selected_domain=None, min_edge_weight=1):
+def build_network_graph(df, domain_index, mode, selected_domain=None, min_edge_weight=1):
     """
     Builds an interactive network for different relationship types.
 
@@ -183,6 +201,8 @@ def build_network_graph(df, mode, selected_domain=None, min_edge_weight=1):
         - 'subreddit_cluster': Subreddit ↔ Narrative Cluster (per domain)
         - 'subreddit_emotion': Subreddit ↔ Emotion (per domain)
         - 'domain_subreddit': Domain ↔ Subreddit (global)
+
+    domain_index is the DomainIndex built from df, used for the per-domain modes.
     """
     # Guard: need basic columns
     required_cols = {'subreddit', 'domain', 'title'}
@@ -193,7 +213,7 @@ def build_network_graph(df, mode, selected_domain=None, min_edge_weight=1):
 
     # Restrict to selected domain where appropriate
     if mode in ['subreddit_cluster', 'subreddit_emotion'] and selected_domain:
-        df_net = df_net[df_net['domain'].str.contains(selected_domain, case=False, na=False)]
+        df_net = domain_index.lookup(df_net, selected_domain)
 
     if df_net.empty:
         return None, pd.DataFrame(), pd.DataFrame()
@@ -204,7 +224,7 @@ def build_network_graph(df, mode, selected_domain=None, min_edge_weight=1):
         if 'cluster' not in df_net.columns:
             return None, pd.DataFrame(), pd.DataFrame()
         agg = (
-            df_net.groupby(['subreddit', 'cluster'])
+            df_net.groupby(['subreddit', 'cluster'], observed=True)
                   .size()
                   .reset_index(name='count')
         )
@@ -234,7 +254,7 @@ def build_network_graph(df, mode, selected_domain=None, min_edge_weight=1):
         if 'emotion' not in df_net.columns:
             return None, pd.DataFrame(), pd.DataFrame()
         agg = (
-            df_net.groupby(['subreddit', 'emotion'])
+            df_net.groupby(['subreddit', 'emotion'], observed=True)
                   .size()
                   .reset_index(name='count')
         )
@@ -260,7 +280,7 @@ def build_network_graph(df, mode, selected_domain=None, min_edge_weight=1):
 
     elif mode == 'domain_subreddit':
         agg = (
-            df_net.groupby(['domain', 'subreddit'])
+            df_net.groupby(['domain', 'subreddit'], observed=True)
                   .size()
                   .reset_index(name='count')
         )
@@ -449,9 +469,6 @@ with st.sidebar:
 st.title("Reddit Domain Intel AI")
 st.markdown("Analyze news domains spreading on Reddit using Sentiment Analysis, Emotion AI, Networks, and LLMs.")
 
-# Load Resources
-embedder, sentiment_model, toxicity_pipe, emotion_pipe = load_nlp_models()
-
 # Load Data
 if uploaded_file:
     raw_df = load_data(uploaded_file)
@@ -468,7 +485,8 @@ if raw_df is not None:
     if 'emotion' not in raw_df.columns:
         st.warning("Dataset missing computed columns (sentiment, toxicity, emotion). Calculation may take time.")
         if st.button(" Calculate AI Features Now"):
-            df = compute_features(raw_df, sentiment_model, toxicity_pipe, emotion_pipe)
+            sentiment_model, toxicity_model, emotion_pipe = load_feature_models()
+            df = compute_features(raw_df, sentiment_model, toxicity_model, emotion_pipe)
             st.session_state['processed_df'] = df
             st.rerun()
         else:
@@ -487,6 +505,8 @@ if raw_df is not None:
 
     default_idx = all_domains.index('youtube.com') if 'youtube.com' in all_domains else 0
 
+    domain_index = load_domain_index(df['domain'], df.get('created_date'))
+
     # --- Tabs ---
     tab1, tab2, tab3, tab4 = st.tabs(["🔍 Domain Analysis", "⚔️ Comparison", "💬 AI Chatbot", "🔗 Network Explorer"])
 
@@ -498,7 +518,7 @@ if raw_df is not None:
         with col1:
             selected_domain = st.selectbox("Select Domain to Analyze", options=all_domains, index=default_idx)
         
-        d_df = df[df['domain'].str.contains(selected_domain, case=False, na=False)].copy()
+        d_df = domain_index.lookup(df, selected_domain)
         
         if d_df.empty:
             st.warning("No data found for this domain.")
@@ -538,9 +558,9 @@ if raw_df is not None:
             # Timeline
             st.subheader("Posting Activity Over Time")
             if 'created_utc' in d_df.columns:
-                daily_counts = d_df.set_index('created_utc').resample('D').size().reset_index(name='count')
+                daily_counts_df = domain_index.daily_counts(selected_domain).reset_index()
                 fig_time = px.line(
-                    daily_counts, x='created_utc', y='count', markers=True,
+                    daily_counts_df, x='created_utc', y='count', markers=True,
                     title="Daily Discussion Volume", template="plotly_white"
                 )
                 st.plotly_chart(fig_time, use_container_width=True)
@@ -585,8 +605,8 @@ if raw_df is not None:
             dom2 = st.selectbox("Domain B", options=dom2_options, index=0 if dom2_options else 0, key="comp2")
 
         if dom1 and dom2:
-            df1 = df[df['domain'].str.contains(dom1, case=False, na=False)]
-            df2 = df[df['domain'].str.contains(dom2, case=False, na=False)]
+            df1 = domain_index.lookup(df, dom1)
+            df2 = domain_index.lookup(df, dom2)
 
             comp_data = {
                 "Metric": ["Posts", "Sentiment", "Toxicity"],
@@ -597,9 +617,9 @@ if raw_df is not None:
 
             if 'created_utc' in df.columns:
                 st.subheader("Activity Comparison")
-                ts1 = df1.set_index('created_utc').resample('D').size().reset_index(name='count')
+                ts1 = domain_index.daily_counts(dom1).reset_index()
                 ts1['Domain'] = dom1
-                ts2 = df2.set_index('created_utc').resample('D').size().reset_index(name='count')
+                ts2 = domain_index.daily_counts(dom2).reset_index()
                 ts2['Domain'] = dom2
                 
                 combined_ts = pd.concat([ts1, ts2])
@@ -630,25 +650,27 @@ if raw_df is not None:
         # Ensure we have a domain context (fall back gracefully)
         domain_for_chat = 'youtube.com' if 'youtube.com' in all_domains else all_domains[0]
 
-        # Vector Database Setup (FAISS) - Run only on domain change
-        if 'faiss_index' not in st.session_state or st.session_state.get('current_domain_rag') != domain_for_chat:
-            with st.spinner(f"Indexing posts for {domain_for_chat}..."):
-                rag_df = df[df['domain'].str.contains(domain_for_chat, case=False, na=False)].copy()
-                
-                if not rag_df.empty:
-                    titles = rag_df['title'].astype(str).tolist()
-                    vectors = embedder.encode(titles)
-                    index = faiss.IndexFlatL2(vectors.shape[1])
-                    index.add(vectors)
-                    
-                    st.session_state['faiss_index'] = index
-                    st.session_state['rag_titles'] = titles
-                    st.session_state['rag_df'] = rag_df
-                    st.session_state['current_domain_rag'] = domain_for_chat
-                else:
-                    st.session_state['faiss_index'] = None
-
         if prompt := st.chat_input("Ex: Why are people angry about this?"):
+            # Vector Database Setup (FAISS) - Run on the first question and on domain change
+            # (every tab's body runs on each rerun, so doing this outside the submit would load the embedder on first paint)
+            if 'faiss_index' not in st.session_state or st.session_state.get('current_domain_rag') != domain_for_chat:
+                with st.spinner(f"Indexing posts for {domain_for_chat}..."):
+                    rag_df = domain_index.lookup(df, domain_for_chat)
+
+                    if not rag_df.empty:
+                        titles = rag_df['title'].astype(str).tolist()
+                        vectors = load_embedder().encode(titles)
+                        import faiss
+                        index = faiss.IndexFlatL2(vectors.shape[1])
+                        index.add(vectors)
+
+                        st.session_state['faiss_index'] = index
+                        st.session_state['rag_titles'] = titles
+                        st.session_state['rag_df'] = rag_df
+                        st.session_state['current_domain_rag'] = domain_for_chat
+                    else:
+                        st.session_state['faiss_index'] = None
+
             if st.session_state['faiss_index'] is None:
                 st.error("No data available to chat about.")
                 st.stop()
@@ -663,7 +685,7 @@ if raw_df is not None:
                 message_placeholder = st.empty()
                 with st.spinner("Analyzing patterns..."):
                     # Retrieve posts via FAISS
-                    q_vec = embedder.encode([prompt])
+                    q_vec = load_embedder().encode([prompt])
                     D, I = st.session_state['faiss_index'].search(q_vec, k=5)
                     retrieved_posts = [st.session_state['rag_titles'][i] for i in I[0]]
 
@@ -763,6 +785,7 @@ if raw_df is not None:
         with st.spinner("Building network graph..."):
             fig_net, node_stats, edge_stats = build_network_graph(
                 df=df,
+                domain_index=domain_index,
                 mode=mode_key,
                 selected_domain=domain_for_network,
                 min_edge_weight=min_edge_weight
@@ -807,7 +830,7 @@ if raw_df is not None:
                             subset_posts = subset_posts.head(0)
 
                     elif mode_key == 'subreddit_cluster':
-                        subset_posts = subset_posts[subset_posts['domain'].str.contains(domain_for_network, case=False, na=False)]
+                        subset_posts = domain_index.lookup(subset_posts, domain_for_network)
                         subset_posts = perform_clustering(subset_posts)
                         if selected_node_for_drill.startswith("Cluster "):
                             cid = int(selected_node_for_drill.split(" ")[1])
@@ -816,7 +839,7 @@ if raw_df is not None:
                             subset_posts = subset_posts[subset_posts['subreddit'] == selected_node_for_drill]
 
                     elif mode_key == 'subreddit_emotion':
-                        subset_posts = subset_posts[subset_posts['domain'].str.contains(domain_for_network, case=False, na=False)]
+                        subset_posts = domain_index.lookup(subset_posts, domain_for_network)
                         if selected_node_for_drill.startswith("Emotion: "):
                             emo = selected_node_for_drill.split("Emotion: ", 1)[1]
                             subset_posts = subset_posts[subset_posts['emotion'] == emo]
@@ -0,0 +1,82 @@
+import os
+
+import pandas as pd
+import pytest
+
+from domain_index import DomainIndex
+from precompute import CSV_PATH, optimize_dtypes, parse_created_utc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# plain domains, substrings spanning several subdomains, and queries that match nothing
+QUERIES = ["youtube.com", "cnn", "reddit", "WWW.", ".org", "i.redd.it", "no-such-domain.example", "", "co"]
+
+
+@pytest.fixture(scope="module")
+def df():
+    path = os.path.join(ROOT, CSV_PATH)
+    if not os.path.exists(path):
+        pytest.skip(f"{CSV_PATH} not present")
+    # the same preparation app.py does before building its index
+    df = pd.read_csv(path)
+    df['created_utc'] = parse_created_utc(df['created_utc'])
+    df['created_date'] = df['created_utc'].dt.floor('D')
+    return optimize_dtypes(df)
+
+
+@pytest.fixture(scope="module")
+def index(df):
+    return DomainIndex(df['domain'], df['created_date'])
+
+
+def scan(df, query):
+    """The row-by-row filter the index replaces."""
+    mask = df['domain'].astype("string").str.contains(query, case=False, regex=False).fillna(False)
+    return df[mask.to_numpy(dtype=bool)]
+
+
+def queries(df):
+    return QUERIES + df['domain'].value_counts().index[:25].tolist()
+
+
+def test_lookup_matches_scan(df, index):
+    for query in queries(df):
+        expected = scan(df, query)
+        got = index.lookup(df, query)
+        pd.testing.assert_index_equal(got.index, expected.index)
+        pd.testing.assert_series_equal(got['title'], expected['title'])
+
+
+def test_lookup_trims_categories(df, index):
+    got = index.lookup(df, "cnn")
+    assert not got.empty
+    assert (got['domain'].value_counts() > 0).all()
+    assert (got['subreddit'].value_counts() > 0).all()
+
+
+def test_daily_counts_matches_resample(df, index):
+    for query in queries(df):
+        rows = scan(df, query)
+        got = index.daily_counts(query)
+        if rows.empty:
+            # resample() on an empty frame raises here, so there's nothing to compare against
+            assert got.empty
+            continue
+        expected = rows.resample('D', on='created_utc').size()
+        assert got.index.equals(expected.index)
+        assert (got.to_numpy() == expected.to_numpy()).all()
+
+
+def test_multi_subdomain_query_sums_domains(df, index):
+    matched = index.matching_keys("cnn")
+    assert len(matched) > 1
+    total = sum(len(index.rows[k]) for k in matched)
+    assert index.daily_counts("cnn").sum() == total == len(scan(df, "cnn"))
+
+
+def test_no_match(df, index):
+    assert index.positions("no-such-domain.example").size == 0
+    assert index.lookup(df, "no-such-domain.example").empty
+    counts = index.daily_counts("no-such-domain.example")
+    assert counts.empty
+    assert isinstance(counts.index, pd.DatetimeIndex)
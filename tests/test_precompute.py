@@ -0,0 +1,45 @@
+import os
+
+import pandas as pd
+import pytest
+
+from precompute import CSV_PATH, CompoundSentimentAnalyzer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# cover each branch compound() copies out of polarity_scores()
+EDGE_CASES = [
+    "",
+    "   ",
+    "The book was good.",
+    "The book was GOOD!!!",
+    "The book was kind of good.",
+    "The plot was good, but the characters are uncompelling.",
+    "Not bad at all",
+    "At least it isn't a horrible book.",
+    "Today SUX!",
+    "Make sure you :) or :D today!",
+    "Catch utf-8 emoji such as 💘 and 💋 and 😁",
+    "no space between😁emoji",
+    "The food here is extremely good?!?!",
+    "nothing to see here",
+]
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return CompoundSentimentAnalyzer()
+
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_compound_matches_polarity_scores(analyzer, text):
+    assert analyzer.compound(text) == analyzer.polarity_scores(text)["compound"]
+
+
+def test_compound_matches_polarity_scores_on_dataset(analyzer):
+    path = os.path.join(ROOT, CSV_PATH)
+    if not os.path.exists(path):
+        pytest.skip(f"{CSV_PATH} not present")
+    titles = pd.read_csv(path, usecols=["title"])["title"].astype(str)
+    mismatches = [t for t in titles if analyzer.compound(t) != analyzer.polarity_scores(t)["compound"]]
+    assert not mismatches, mismatches[:5]